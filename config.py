@@ -1,18 +1,23 @@
-from environs import Env
-from typing import List
+import logging
+from environs import Env, validate
+from typing import FrozenSet, Tuple
 
 env = Env()
 env.read_env()  # Versucht automatisch eine .env Datei zu laden
 
+# Gültige Log-Level Namen (einmalig beim Import ermittelt)
+_VALID_LOG_LEVELS = frozenset(logging.getLevelNamesMapping())
+
 class Config:
     # --- Project Metadata ---
     VERSION: str = "0.2.0"
 
     # --- Listener ---
     LISTENER_HOST: str = env.str("LISTENER_HOST", default="0.0.0.0")
-    LISTENER_PORT: int = env.int("LISTENER_PORT", default=1799)
-    LISTENER_BUFFER: int = env.int("LISTENER_BUFFER", default=2048)
-    STORE_TYPES: List[str] = env.list("STORE_TYPES", default=["msg", "pos", "tele"])
+    LISTENER_PORT: int = env.int("LISTENER_PORT", default=1799, validate=validate.Range(min=1, max=65535))
+    LISTENER_BUFFER: int = env.int("LISTENER_BUFFER", default=2048, validate=validate.Range(min=1))
+    LISTENER_RCVBUF: int = env.int("LISTENER_RCVBUF", default=8 * 1024 * 1024, validate=validate.Range(min=0))  # 0 = OS default
+    STORE_TYPES: FrozenSet[str] = frozenset(env.list("STORE_TYPES", default=["msg", "pos", "tele"]))
 
     # --- SurrealDB ---
     DB_URL: str = env.str("DB_URL", default="ws://surrealdb:8000")
@@ -20,21 +25,29 @@ class Config:
     DB_PASS: str = env.str("DB_PASS", default="root")
     DB_NS: str = env.str("DB_NS", default="meshcom")
     DB_DB: str = env.str("DB_DB", default="listener")
-    DB_RETENTION_DAYS: int = env.int("DB_RETENTION_DAYS", default=7)
+    DB_RETENTION_DAYS: int = env.int("DB_RETENTION_DAYS", default=7, validate=validate.Range(min=1))
+    DB_BATCH_SIZE: int = env.int("DB_BATCH_SIZE", default=50, validate=validate.Range(min=1))
+    DB_FLUSH_INTERVAL: float = env.float("DB_FLUSH_INTERVAL", default=1.0, validate=validate.Range(min=0.1))
 
     # --- Notifications (Apprise API) ---
     NOTIFY_ENABLED: bool = env.bool("NOTIFY_ENABLED", default=False)
     APPRISE_URL: str = env.str("APPRISE_URL", default="http://apprise:8000/notify")
-    NOTIFY_TARGETS: List[str] = env.list("NOTIFY_TARGETS", default=[])
+    NOTIFY_TARGETS: Tuple[str, ...] = tuple(env.list("NOTIFY_TARGETS", default=[]))
     
     # --- Forwarding Filters ---
-    FORWARD_TYPES: List[str] = env.list("FORWARD_TYPES", default=["msg", "pos"])
-    FORWARD_INCLUDE_DST: List[str] = env.list("FORWARD_INCLUDE_DST", default=[])
-    FORWARD_EXCLUDE_DST: List[str] = env.list("FORWARD_EXCLUDE_DST", default=["*"])
-    FORWARD_EXCLUDE_SRC: List[str] = env.list("FORWARD_EXCLUDE_SRC", default=[])
+    # Immutable sets: shared safely by all consumers, O(1) membership per packet
+    FORWARD_TYPES: FrozenSet[str] = frozenset(env.list("FORWARD_TYPES", default=["msg", "pos"]))
+    FORWARD_INCLUDE_DST: FrozenSet[str] = frozenset(env.list("FORWARD_INCLUDE_DST", default=[]))
+    FORWARD_EXCLUDE_DST: FrozenSet[str] = frozenset(env.list("FORWARD_EXCLUDE_DST", default=["*"]))
+    FORWARD_EXCLUDE_SRC: FrozenSet[str] = frozenset(env.list("FORWARD_EXCLUDE_SRC", default=[]))
 
     # --- Logging ---
-    LOG_LEVEL: str = env.str("LOG_LEVEL", default="INFO")
+    # Case-insensitive, normalized once to upper case (e.g. "debug" -> "DEBUG")
+    LOG_LEVEL: str = env.str(
+        "LOG_LEVEL",
+        default="INFO",
+        validate=lambda level: level.upper() in _VALID_LOG_LEVELS,
+    ).upper()
 
 # Singleton Instanz
 config = Config()
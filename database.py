@@ -1,5 +1,5 @@
+import asyncio
 import logging
-import os
 from surrealdb import AsyncSurreal
 from config import config
 
@@ -13,7 +13,9 @@ class SurrealHandler:
         self.password = config.DB_PASS
         self.namespace = config.DB_NS
         self.database = config.DB_DB
+        self.batch_size = config.DB_BATCH_SIZE
         self.db = None
+        self._pending = []
 
     async def connect(self):
         """Initialize connection to SurrealDB."""
@@ -34,37 +36,63 @@ class SurrealHandler:
 
     async def init_schema(self, schema_file: str = "schema.surql"):
         """Apply SurrealQL schema from file."""
-        if not os.path.exists(schema_file):
+        try:
+            with open(schema_file, "r") as f:
+                surql = f.read()
+        except FileNotFoundError:
             log.warning(f"Schema file {schema_file} not found. Skipping auto-init.")
             return
 
         log.info(f"Applying schema from {schema_file}...")
-        with open(schema_file, "r") as f:
-            surql = f.read()
-            await self.db.query(surql)
+        await self.db.query(surql)
         log.info("Schema successfully applied.")
 
-    async def save_message(self, db_data: dict):
-        """Save pre-structured message data to SurrealDB."""
+    async def queue_message(self, db_data: dict):
+        """Buffer a message; write the buffer once DB_BATCH_SIZE messages are pending."""
+        self._pending.append(db_data)
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        """Write all buffered messages in one batch."""
+        if not self._pending:
+            return
+        # Swap before awaiting so messages queued meanwhile go into the next batch
+        rows, self._pending = self._pending, []
+        try:
+            await self.save_messages(rows)
+        except asyncio.CancelledError:
+            # Interrupted mid-write: put the rows back so close() can still write them
+            self._pending[:0] = rows
+            raise
+
+    async def save_messages(self, rows: list):
+        """Save a batch of pre-structured messages in a single INSERT round-trip."""
         if not self.db:
             log.error("Database not connected. Cannot save message.")
             return
+        if not rows:
+            return
 
         try:
-            # Table is now 'message' again
-            result = await self.db.create("message", db_data)
-            
-            # Robust logging of the ID
-            record_id = "???"
-            if result and isinstance(result, list):
-                first = result[0]
-                record_id = first.get("id") if isinstance(first, dict) else first
-            elif isinstance(result, dict):
-                record_id = result.get("id", "???")
-            
-            log.debug(f"Saved {db_data['msg_type']} from {db_data['src']} to SurrealDB. ID: {record_id}")
+            await self.db.insert("message", rows)
+            log.debug(f"Saved {len(rows)} message(s) to SurrealDB.")
+            return
         except Exception as e:
-            log.error(f"Error saving message to SurrealDB: {e}")
+            if len(rows) == 1:
+                log.error(f"Error saving message to SurrealDB: {e}")
+                return
+            log.warning(f"Batch insert of {len(rows)} messages failed ({e}). Retrying one by one...")
+
+        # One bad row fails the whole INSERT; retry individually so only that row is lost
+        saved = 0
+        for row in rows:
+            try:
+                await self.db.insert("message", [row])
+                saved += 1
+            except Exception as e:
+                log.error(f"Error saving {row.get('msg_type')} from {row.get('src')} to SurrealDB: {e}")
+        log.info(f"Saved {saved} of {len(rows)} message(s) after batch failure.")
 
     async def prune_old_messages(self, days: int):
         """Delete messages older than X days."""
@@ -82,8 +110,9 @@ class SurrealHandler:
             log.error(f"Housekeeping failed: {e}")
 
     async def close(self):
-        """Close connection."""
+        """Flush buffered messages and close connection."""
         if self.db:
+            await self.flush()
             await self.db.close()
             self.db = None
             log.info("SurrealDB connection closed.")
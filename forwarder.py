@@ -1,22 +1,154 @@
+import asyncio
 import httpx
 import logging
 import json
+import time
 from config import config
 
 log = logging.getLogger("meshcom.forwarder")
 
+# Retry handling for rate limiting (429) / temporary unavailability (503)
+MAX_ATTEMPTS = 3
+MAX_RETRY_AFTER = 30.0
+
+# Pending notifications beyond this are dropped instead of piling up in memory
+QUEUE_SIZE = 1000
+
 class AppriseForwarder:
     """Handles forwarding messages to Apprise API with templates."""
     def __init__(self):
         self.api_url = config.APPRISE_URL
         self.targets = config.NOTIFY_TARGETS
+        # Apprise expects the targets as one comma-separated string; build it once
+        self.urls = ",".join(self.targets)
         self.enabled = config.NOTIFY_ENABLED
+        # Template dispatch by msg_type; anything else uses the raw fallback
+        self._formatters = {
+            "msg": self._format_msg,
+            "pos": self._format_pos,
+        }
+        # Circuit breaker: skip sending while Apprise keeps failing
+        self._failures = 0
+        self._open_until = 0.0
+        self._skipped = 0  # notifications dropped during the current open period
+        # Shared HTTP client (keep-alive), created on first use
+        self._client = None
+        # Outgoing queue, drained by a single worker task (see start())
+        self._queue = None
+        self._worker = None
+
+    def _format_msg(self, msg_type, src, via_display, raw_payload):
+        """✉️ Template for text messages."""
+        msg_text = raw_payload.get("msg", "")
+        dst = raw_payload.get("dst", "???")
+        title = f"✉️ from {src}"
+        body = f"To: {dst}\nVia: {via_display}\n\n{msg_text}"
+        return title, body
+
+    def _format_pos(self, msg_type, src, via_display, raw_payload):
+        """📍 Template for position reports, including an OSM link."""
+        lat = raw_payload.get("lat", "?")
+        long = raw_payload.get("long", "?")
+        alt = raw_payload.get("alt", "?")
+        title = f"📍 from {src}"
+        body = f"Via: {via_display}\nLat: {lat}, Lon: {long}\nAlt: {alt}ft"
+        if lat != "?" and long != "?":
+            body += f"\n[OSM Map](https://www.openstreetmap.org/?mlat={lat}&mlon={long}#map=15/{lat}/{long})"
+        return title, body
+
+    def _format_raw(self, msg_type, src, via_display, raw_payload):
+        """📡 Fallback template for tele, status, ack, etc."""
+        title = f"📡 {msg_type.upper()} from {src}"
+        body = f"Via: {via_display}\n```json\n{json.dumps(raw_payload, indent=2)}\n```"
+        return title, body
+
+    def _get_client(self):
+        """Return the shared HTTP client so connections to Apprise are reused."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10.0)
+        return self._client
+
+    def start(self):
+        """Start the background worker that sends queued notifications."""
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+            self._worker = asyncio.create_task(self._run_worker())
+
+    def enqueue(self, data_dict: dict):
+        """Queue a notification without waiting for the Apprise round-trip."""
+        if self._queue is None:
+            log.error("Notification worker not started. Cannot queue notification.")
+            return
+        try:
+            self._queue.put_nowait(data_dict)
+        except asyncio.QueueFull:
+            log.warning(f"Notification queue full ({QUEUE_SIZE}). Dropping {data_dict.get('msg_type')} from {data_dict.get('src')}.")
+
+    async def _run_worker(self):
+        """Send queued notifications one at a time (keeps order, respects rate limits)."""
+        while True:
+            data_dict = await self._queue.get()
+            try:
+                await self.send_notification(data_dict)
+            except Exception as e:
+                log.error(f"Error in notification worker: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def close(self):
+        """Stop the worker and close the shared HTTP client."""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            pending = self._queue.qsize()
+            if pending:
+                log.warning(f"Discarding {pending} unsent notifications.")
+            self._worker = None
+            self._queue = None
+        self._report_skipped()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _retry_after(response):
+        """Seconds to wait before retrying, or None if the response is not retryable."""
+        if response.status_code not in (429, 503):
+            return None
+        try:
+            delay = float(response.headers.get("Retry-After", 1))
+        except ValueError:
+            # HTTP-date form is not worth parsing here; fall back to a short pause
+            delay = 1.0
+        return min(max(delay, 0.0), MAX_RETRY_AFTER)
+
+    def _record_failure(self):
+        """Open the circuit after 3 consecutive failures (exponential backoff, max 60s)."""
+        self._failures += 1
+        if self._failures >= 3:
+            backoff = min(60, 2 ** self._failures)
+            self._open_until = time.monotonic() + backoff
+            log.warning(f"Apprise failed {self._failures} times in a row. Pausing notifications for {backoff}s.")
+
+    def _report_skipped(self):
+        """Log how many notifications were dropped while the circuit was open."""
+        if self._skipped:
+            log.warning(f"Dropped {self._skipped} notification(s) while the Apprise circuit breaker was open.")
+            self._skipped = 0
 
     async def send_notification(self, data_dict: dict):
         """Send formatted message to Apprise API targets based on type."""
         if not self.enabled or not self.targets:
             return False
 
+        if time.monotonic() < self._open_until:
+            # Warn once per open period; the total is reported when the circuit closes
+            if not self._skipped:
+                log.warning("Apprise circuit breaker is open. Dropping notifications until it closes.")
+            self._skipped += 1
+            return False
+        self._report_skipped()
+
         msg_type = data_dict.get("msg_type", "unknown")
         src = data_dict.get("src", "???")
         via = data_dict.get("via", [])
@@ -28,29 +160,11 @@ class AppriseForwarder:
             via_display += f"{', '.join(via)}"
 
         # --- Template Logic ---
-        if msg_type == "msg":
-            msg_text = raw_payload.get("msg", "")
-            dst = raw_payload.get("dst", "???")
-            title = f"✉️ from {src}"
-            body = f"To: {dst}\nVia: {via_display}\n\n{msg_text}"
-
-        elif msg_type == "pos":
-            lat = raw_payload.get("lat", "?")
-            long = raw_payload.get("long", "?")
-            alt = raw_payload.get("alt", "?")
-            title = f"📍 from {src}"
-            body = f"Via: {via_display}\nLat: {lat}, Lon: {long}\nAlt: {alt}ft"
-            if lat != "?" and long != "?":
-                body += f"\n[OSM Map](https://www.openstreetmap.org/?mlat={lat}&mlon={long}#map=15/{lat}/{long})"
-
-        else:
-            # Fallback for tele, status, ack, etc.
-            title = f"📡 {msg_type.upper()} from {src}"
-            body = f"Via: {via_display}\n```json\n{json.dumps(raw_payload, indent=2)}\n```"
-
+        formatter = self._formatters.get(msg_type, self._format_raw)
+        title, body = formatter(msg_type, src, via_display, raw_payload)
 
         payload = {
-            "urls": ",".join(self.targets),
+            "urls": self.urls,
             "title": title,
             "body": body,
             "format": "markdown",
@@ -59,14 +173,22 @@ class AppriseForwarder:
 
         try:
             log.debug(f"Sending {msg_type} notification from {src}...")
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(self.api_url, json=payload)
-                response.raise_for_status()
-                log.info(f"Notification successfully sent to {len(self.targets)} targets.")
-                return True
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                response = await self._get_client().post(self.api_url, json=payload)
+                retry_after = self._retry_after(response)
+                if retry_after is None or attempt == MAX_ATTEMPTS:
+                    break
+                log.warning(f"Apprise API returned {response.status_code}. Retrying in {retry_after}s ({attempt}/{MAX_ATTEMPTS})...")
+                await asyncio.sleep(retry_after)
+            response.raise_for_status()
+            log.info(f"Notification successfully sent to {len(self.targets)} targets.")
+            self._failures = 0
+            return True
         except httpx.HTTPStatusError as e:
             log.error(f"Apprise API returned error: {e.response.status_code} - {e.response.text}")
+            self._record_failure()
             return False
         except Exception as e:
             log.error(f"Error sending notification to Apprise: {e}")
+            self._record_failure()
             return False
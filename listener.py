@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import json
+import socket
 from config import config
 
 log = logging.getLogger("meshcom.listener")
@@ -10,11 +11,38 @@ class MeshComProtocol(asyncio.DatagramProtocol):
     def __init__(self, db_handler, forwarder):
         self.db = db_handler
         self.forwarder = forwarder
+        # Wildcard checks don't depend on the packet; resolve them once
+        self.store_all = "*" in config.STORE_TYPES
+        self.forward_all = "*" in config.FORWARD_TYPES
+        # Strong references to in-flight packet tasks (the event loop only keeps weak ones)
+        self._tasks = set()
 
     def connection_made(self, transport):
         self.transport = transport
+        if config.LISTENER_RCVBUF:
+            self._set_receive_buffer(transport.get_extra_info("socket"))
         log.info(f"UDP Listener ready on {config.LISTENER_HOST}:{config.LISTENER_PORT}")
 
+    async def drain(self, timeout: float) -> int:
+        """Wait up to timeout seconds for in-flight packets; return how many are still unfinished."""
+        if not self._tasks:
+            return 0
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        return len(pending)
+
+    def _set_receive_buffer(self, sock):
+        """Enlarge the kernel receive buffer so bursts are not dropped silently."""
+        if sock is None:
+            return
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, config.LISTENER_RCVBUF)
+        except OSError as e:
+            log.warning(f"Could not set SO_RCVBUF to {config.LISTENER_RCVBUF}: {e}")
+            return
+        # The kernel may clamp (net.core.rmem_max) or double the requested value
+        actual = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        log.info(f"UDP receive buffer: requested {config.LISTENER_RCVBUF} bytes, effective {actual} bytes")
+
     def datagram_received(self, data, addr):
         """Called when a UDP datagram is received."""
         try:
@@ -22,25 +50,34 @@ class MeshComProtocol(asyncio.DatagramProtocol):
             message_dict = json.loads(message_str)
             
             # Use asyncio.create_task to process message without blocking the listener
-            asyncio.create_task(self._process_message(message_dict, addr))
+            task = asyncio.create_task(self._process_message(message_dict, addr))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
             
         except (UnicodeDecodeError, json.JSONDecodeError) as e:
-            log.warning(f"Malformed packet from {addr}: {e}")
+            log.warning("Malformed packet from %s: %s", addr, e)
         except Exception as e:
             log.error(f"Unexpected error processing packet from {addr}: {e}", exc_info=True)
 
     async def _process_message(self, message_dict, addr):
         """Handle storing and forwarding of a message."""
         msg_type = message_dict.get("type")
+        # Untrusted JSON: a missing or non-string type (e.g. a list) would break the set lookups,
+        # the notification templates and the schema's string field
+        if not isinstance(msg_type, str):
+            msg_type = "unknown"
         
         # Parse 'src' to separate sender from routing path (via)
         raw_src = message_dict.get("src", "")
-        src_parts = [s.strip() for s in raw_src.split(",") if s.strip()]
+        src_parts = [part for part in map(str.strip, raw_src.split(",")) if part]
         sender = src_parts[0] if src_parts else "unknown"
-        via_path = src_parts[1:] if len(src_parts) > 1 else []
+        via_path = src_parts[1:]
         
-        log.info(f"Received {msg_type} from {sender} ({addr})")
-        log.debug(f"Full message content: {json.dumps(message_dict)}")
+        # Per-packet log calls use %-style args so filtered records are never formatted
+        log.info("Received %s from %s (%s)", msg_type, sender, addr)
+        # Skip the re-serialisation entirely unless debug output is wanted
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(f"Full message content: {json.dumps(message_dict)}")
 
         # Prepare structured data for DB
         db_data = {
@@ -52,38 +89,41 @@ class MeshComProtocol(asyncio.DatagramProtocol):
         }
 
         # 1. Save to Database (if type is in STORE_TYPES)
-        if msg_type in config.STORE_TYPES or "*" in config.STORE_TYPES:
-            await self.db.save_message(db_data)
+        if self.store_all or msg_type in config.STORE_TYPES:
+            await self.db.queue_message(db_data)
 
         # 2. Forward to Notifications (with complex filtering)
         if config.NOTIFY_ENABLED:
-            should_forward = False
-            
-            # Filter by Type
-            if msg_type in config.FORWARD_TYPES or "*" in config.FORWARD_TYPES:
-                should_forward = True
-                
-                # Special filters for 'msg' types
-                if msg_type == "msg":
-                    dst = message_dict.get("dst")
-                    
-                    # 1. Check Source Exclusion (e.g., time-sync nodes)
-                    if sender in config.FORWARD_EXCLUDE_SRC:
-                        should_forward = False
-                        log.debug(f"Notification suppressed: {sender} is in EXCLUDE_SRC.")
-                    
-                    # 2. Check Destination Inclusion (if list is not empty, must be in it)
-                    if should_forward and config.FORWARD_INCLUDE_DST:
-                        if dst not in config.FORWARD_INCLUDE_DST:
-                            should_forward = False
-                            log.debug(f"Notification suppressed: {dst} not in INCLUDE_DST.")
-                    
-                    # 3. Check Destination Exclusion (e.g., broadcasts '*')
-                    if should_forward and dst in config.FORWARD_EXCLUDE_DST:
-                        should_forward = False
-                        log.debug(f"Notification suppressed: Destination {dst} is in EXCLUDE_DST.")
-
-            if should_forward:
-                await self.forwarder.send_notification(db_data)
+            if self._should_forward(msg_type, sender, message_dict.get("dst")):
+                self.forwarder.enqueue(db_data)
             else:
-                log.debug(f"Notification skipped for {msg_type} from {sender} based on filters.")
+                log.debug("Notification skipped for %s from %s based on filters.", msg_type, sender)
+
+    def _should_forward(self, msg_type, sender, dst):
+        """Apply the FORWARD_* filters. Source/destination filters only apply to 'msg' types."""
+        # Filter by Type
+        if not (self.forward_all or msg_type in config.FORWARD_TYPES):
+            return False
+        if msg_type != "msg":
+            return True
+
+        # dst comes from untrusted JSON; a list/dict is unhashable and can't match the filter sets
+        if not isinstance(dst, str):
+            dst = None
+
+        # 1. Check Source Exclusion (e.g., time-sync nodes)
+        if sender in config.FORWARD_EXCLUDE_SRC:
+            log.debug("Notification suppressed: %s is in EXCLUDE_SRC.", sender)
+            return False
+
+        # 2. Check Destination Inclusion (if set is not empty, must be in it)
+        if config.FORWARD_INCLUDE_DST and dst not in config.FORWARD_INCLUDE_DST:
+            log.debug("Notification suppressed: %s not in INCLUDE_DST.", dst)
+            return False
+
+        # 3. Check Destination Exclusion (e.g., broadcasts '*')
+        if dst in config.FORWARD_EXCLUDE_DST:
+            log.debug("Notification suppressed: Destination %s is in EXCLUDE_DST.", dst)
+            return False
+
+        return True
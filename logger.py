@@ -74,11 +74,12 @@ def setup_logging(logging_config: SimpleNamespace):
             backup_count = logging_config.file.retained_file_count_limit
 
             # Verzeichnis für Logdatei erstellen, falls nicht vorhanden
+            # (makedirs mit exist_ok=True spart den separaten exists()-Check)
             log_dir = os.path.dirname(log_file_path)
-            if log_dir and not os.path.exists(log_dir):
+            if log_dir:
                 try:
                     os.makedirs(log_dir, exist_ok=True)
-                    log.debug("Log-Verzeichnis '%s' erstellt.", log_dir)
+                    log.debug("Log-Verzeichnis '%s' sichergestellt.", log_dir)
                 except OSError as e:
                     # Loggen, aber weitermachen - Handler-Erstellung wird wahrscheinlich fehlschlagen
                     log.error("Konnte Log-Verzeichnis '%s' nicht erstellen: %s", log_dir, e)
@@ -137,52 +138,3 @@ def setup_logging(logging_config: SimpleNamespace):
         # Hier könnte man eine absolute Notfall-Logausgabe machen, falls alles schiefgeht
         print(f"!!! KRITISCHER FEHLER BEI LOGGING-INIT: {e}", file=sys.stderr)
         raise # Den Fehler weitergeben, damit das Hauptprogramm abbricht
-
-# Beispiel für die Verwendung (im Hauptskript)
-if __name__ == "__main__":
-    # Dieser Teil dient nur zur Demonstration und zum Testen von logger.py direkt.
-    # Im echten Programm wird setup_logging aus main.py aufgerufen.
-
-    print("--- Teste logger.py ---")
-    # Erstelle eine Beispiel-Konfiguration (normalerweise kommt die aus ConfigLoader)
-    test_config_dict = {
-        "console": {
-            "level": "DEBUG"
-        },
-        "file": {
-            "path": "logs/test_logger.log",
-            "level": "INFO",
-            "rolling_interval": "day",
-            "retained_file_count_limit": 3,
-            "output_template": "[%(asctime)s %(levelname)-8s] %(name)-15s: %(message)s"
-        }
-    }
-    # Wandle das Dict in SimpleNamespace um, so wie es ConfigLoader tun würde
-    test_logging_config = SimpleNamespace(
-        console=SimpleNamespace(**test_config_dict["console"]),
-        file=SimpleNamespace(**test_config_dict["file"])
-    )
-
-    print("Konfiguriere Logging mit Beispiel-Einstellungen...")
-    try:
-        setup_logging(test_logging_config)
-
-        # Hol dir Logger für verschiedene "Module" und logge Testnachrichten
-        main_log = logging.getLogger("main_test")
-        db_log = logging.getLogger("database_test")
-
-        main_log.debug("Dies ist eine Debug-Nachricht von main.") # Sollte nur auf Konsole erscheinen
-        main_log.info("Dies ist eine Info-Nachricht von main.")   # Konsole + Datei
-        db_log.warning("Dies ist eine Warnung von database.")     # Konsole + Datei
-        db_log.error("Dies ist ein Fehler von database.")         # Konsole + Datei
-        main_log.critical("Dies ist eine kritische Meldung.")     # Konsole + Datei
-
-        print("\nLogging-Test abgeschlossen. Überprüfe die Konsole und die Datei 'logs/test_logger.log'.")
-        print("Die Datei sollte INFO, WARNING, ERROR, CRITICAL enthalten.")
-        print("Die Konsole sollte DEBUG, INFO, WARNING, ERROR, CRITICAL enthalten.")
-
-    except Exception as e:
-        print(f"\nFEHLER während des Logger-Tests: {e}", file=sys.stderr)
-        # Im Fehlerfall Traceback manuell ausgeben, da Logging evtl. nicht geht
-        import traceback
-        traceback.print_exc()
\ No newline at end of file
@@ -1,6 +1,9 @@
 import typer
 import asyncio
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 import signal
 from typing import Optional
@@ -10,11 +13,21 @@ from forwarder import AppriseForwarder
 from listener import MeshComProtocol
 
 # Logging initialisieren (StreamHandler for Docker/12-factor)
+# Records are passed through a queue; a QueueListener thread does the stdout writes,
+# so logging never blocks the event loop.
+log_queue = queue.SimpleQueue()
+stream_handler = logging.StreamHandler(sys.stdout)
+stream_handler.setFormatter(logging.Formatter("[%(asctime)s %(levelname)s] %(name)s: %(message)s"))
+log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
 logging.basicConfig(
     level=config.LOG_LEVEL,
-    format="[%(asctime)s %(levelname)s] %(name)s: %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)]
+    format="%(message)s",  # Final layout is applied by stream_handler
+    handlers=[logging.handlers.QueueHandler(log_queue)]
 )
+# The layout above uses none of the process/thread/task fields, so skip collecting them per record
+logging.logProcesses = logging.logThreads = logging.logMultiprocessing = logging.logAsyncioTasks = False
+log_listener.start()
+atexit.register(log_listener.stop)
 log = logging.getLogger("meshcom")
 
 # Typer Apps initialisieren
@@ -25,23 +38,13 @@ db_app = typer.Typer(help="Manage SurrealDB")
 app.add_typer(test_app, name="test")
 app.add_typer(db_app, name="db")
 
+# Upper bound for each shutdown step that waits on in-flight work (Docker sends SIGKILL after 10s)
+SHUTDOWN_TIMEOUT = 3.0
+
 # Global instances
 db_handler = SurrealHandler()
 forwarder = AppriseForwarder()
 
-async def shutdown(loop, signal=None):
-    """Cleanup tasks on shutdown."""
-    if signal:
-        log.info(f"Received exit signal {signal.name}...")
-    log.info("Closing database connections...")
-    await db_handler.close()
-    
-    tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
-    [t.cancel() for t in tasks]
-    log.info(f"Cancelling {len(tasks)} outstanding tasks...")
-    await asyncio.gather(*tasks, return_exceptions=True)
-    loop.stop()
-
 async def housekeeping_task():
     """Periodic task to prune old database records."""
     log.info(f"Housekeeping task started (Retention: {config.DB_RETENTION_DAYS} days).")
@@ -54,6 +57,18 @@ async def housekeeping_task():
         # Wait 4 hours before next run
         await asyncio.sleep(4 * 3600)
 
+async def flush_task(stop: asyncio.Event):
+    """Periodic task to write buffered messages to the database until stop is set."""
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=config.DB_FLUSH_INTERVAL)
+        except TimeoutError:
+            pass
+        try:
+            await db_handler.flush()
+        except Exception as e:
+            log.error(f"Error in flush loop: {e}")
+
 @app.command()
 def serve():
     """Start the async UDP listener."""
@@ -66,8 +81,14 @@ def serve():
         await db_handler.connect()
         await db_handler.init_schema()
         
-        # 2. Start Housekeeping Task
-        asyncio.create_task(housekeeping_task())
+        # Set by SIGINT/SIGTERM; also stops the flush loop between writes
+        stop = asyncio.Event()
+
+        # 2. Start Housekeeping, Flush and Notification Tasks
+        housekeeping = asyncio.create_task(housekeeping_task())
+        flusher = asyncio.create_task(flush_task(stop))
+        if config.NOTIFY_ENABLED:
+            forwarder.start()
         
         # 3. Start UDP Listener
         log.info(f"Listening for UDP packets on {config.LISTENER_HOST}:{config.LISTENER_PORT}")
@@ -76,12 +97,36 @@ def serve():
             local_addr=(config.LISTENER_HOST, config.LISTENER_PORT)
         )
         
+        # Sleep until SIGINT/SIGTERM (e.g. 'docker stop') instead of waking up periodically
+        def request_stop(sig):
+            log.info(f"Received exit signal {sig.name}...")
+            stop.set()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, request_stop, sig)
+
         try:
-            # Keep the loop running
-            while True:
-                await asyncio.sleep(3600)
-        except asyncio.CancelledError:
+            await stop.wait()
+        finally:
+            stop.set()
             transport.close()
+            # Let packets already received finish (they may be mid-flush), but don't wait forever
+            unfinished = await protocol.drain(SHUTDOWN_TIMEOUT)
+            if unfinished:
+                log.warning(f"{unfinished} packet(s) still being processed after {SHUTDOWN_TIMEOUT}s. Continuing shutdown.")
+            housekeeping.cancel()
+            # The flush loop exits on its own after its current write; cancel only if it is stuck
+            await asyncio.wait([housekeeping, flusher], timeout=SHUTDOWN_TIMEOUT)
+            flusher.cancel()
+            await asyncio.gather(flusher, return_exceptions=True)
+            # Write out buffered messages before the loop goes away
+            log.info("Closing database connections...")
+            try:
+                await asyncio.wait_for(db_handler.close(), timeout=SHUTDOWN_TIMEOUT)
+            except TimeoutError:
+                log.error(f"Closing the database did not finish within {SHUTDOWN_TIMEOUT}s. Unsaved messages are lost.")
+            finally:
+                await forwarder.close()
 
     try:
         asyncio.run(main_loop())
@@ -92,12 +137,13 @@ def serve():
 def test_config():
     """Display current configuration (masked secrets)."""
     typer.echo(f"MeshCom Listener Version: {config.VERSION}")
-    typer.echo(f"Listener: {config.LISTENER_HOST}:{config.LISTENER_PORT} (Buffer: {config.LISTENER_BUFFER})")
-    typer.echo(f"Storing Types: {config.STORE_TYPES}")
+    typer.echo(f"Listener: {config.LISTENER_HOST}:{config.LISTENER_PORT} (Buffer: {config.LISTENER_BUFFER}, SO_RCVBUF: {config.LISTENER_RCVBUF or 'OS default'})")
+    typer.echo(f"Storing Types: {sorted(config.STORE_TYPES)}")
     typer.echo(f"Database: {config.DB_URL} (User: {config.DB_USER}, NS: {config.DB_NS}, DB: {config.DB_DB})")
+    typer.echo(f"Database Batching: {config.DB_BATCH_SIZE} messages / {config.DB_FLUSH_INTERVAL}s")
     typer.echo(f"Apprise URL: {config.APPRISE_URL}")
     typer.echo(f"Notifications: {'ENABLED' if config.NOTIFY_ENABLED else 'DISABLED'}")
-    typer.echo(f"Notification Targets: {config.NOTIFY_TARGETS}")
+    typer.echo(f"Notification Targets: {list(config.NOTIFY_TARGETS)}")
 
 @test_app.command("db")
 def test_db():
@@ -141,6 +187,8 @@ def test_notify():
         except Exception as e:
             typer.echo(f"❌ Apprise test failed: {e}")
             raise typer.Exit(code=1)
+        finally:
+            await forwarder.close()
             
     asyncio.run(_test())
 
@@ -1,17 +1,33 @@
 import socket
 import sys
+import time
 
 if len(sys.argv) < 2:
-    print("Usage: python sender.py <target IP>")
+    print("Usage: python sender.py <target IP> [count] [rate (packets/s, 0 = unlimited)]")
     sys.exit(1)
 
 UDP_IP = sys.argv[1]
 UDP_PORT = 1799
 MESSAGE = b"Hello, World!"
+COUNT = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+RATE = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
 
 print("UDP target IP: %s" % UDP_IP)
 print("UDP target port: %s" % UDP_PORT)
 print("message: %s" % MESSAGE)
+print("count: %d, rate: %s" % (COUNT, "%g/s" % RATE if RATE > 0 else "unlimited"))
 
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-sock.sendto(MESSAGE, (UDP_IP, UDP_PORT))
\ No newline at end of file
+# One socket for all packets; pacing uses absolute monotonic deadlines so sleep jitter doesn't accumulate
+target = (UDP_IP, UDP_PORT)
+interval = 1.0 / RATE if RATE > 0 else 0.0
+with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+    start = time.monotonic()
+    for i in range(COUNT):
+        if interval:
+            delay = start + i * interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        sock.sendto(MESSAGE, target)
+    elapsed = time.monotonic() - start
+
+print("sent %d packet(s) in %.3fs" % (COUNT, elapsed))